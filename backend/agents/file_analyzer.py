@@ -1,41 +1,51 @@
 """
-AutoGen File Analyzer Agent for Excel file analysis
+File Analyzer for Excel file analysis
 Phase 2A: File Upload & Analysis
-Compatible with pyautogen 0.4.0 and openai 1.55.3
+Uses OpenAI structured outputs (openai 1.55.3) for single-shot field extraction
 """
 import os
 import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from analysis_store import CacheStore, create_cache_store
 
 # Configure logging for debugging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import AutoGen components - pyautogen 0.1.14 structure
+# Import OpenAI async client - structured outputs need openai>=1.40
 try:
-    from autogen import AssistantAgent, UserProxyAgent
+    from openai import AsyncOpenAI
 except ImportError as e:
-    logger.error(f"Failed to import AutoGen components: {e}")
+    logger.error("Failed to import OpenAI client: %s", e)
     raise
 
-def create_file_analyzer():
-    """
-    Create AutoGen agent for analyzing one Excel file at a time
-    Compatible with pyautogen 0.1.14
-    
-    Returns:
-        AssistantAgent: Configured agent for file analysis
-    """
-    # AutoGen 0.4.0 syntax: modern config structure
-    config_list = [{
-        "model": "gpt-4o",  # Use GPT-4o for better performance
-        "api_key": os.environ.get("OPENAI_API_KEY"),
-        "timeout": 120  # Increase timeout for complex analysis
-    }]
-    
-    # Clear system message for file analysis
-    system_message = """You are an Excel field extractor. Your job is simple:
+# Model used for field extraction (also part of the response cache key)
+MODEL_NAME = "gpt-4o"
+
+# OpenAI request timeout in seconds - generous for complex analysis
+REQUEST_TIMEOUT = 120
+
+# Field lists at most this long, made of short ASCII names, are extracted
+# locally - listing and counting them needs no LLM reasoning
+LOCAL_EXTRACTION_MAX_FIELDS = 50
+LOCAL_EXTRACTION_MAX_NAME_LENGTH = 64
+
+# Embedding model used by the semantic (near-duplicate) cache
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Retries after a schema validation failure (each retry feeds the error back)
+MAX_EXTRACTION_RETRIES = 2
+
+# Clear system message for file analysis
+SYSTEM_MESSAGE = """You are an Excel field extractor. Your job is simple:
 
 EXTRACT FIELDS ONLY:
 1. List the fields provided to you
@@ -57,133 +67,384 @@ RULES:
 - Keep response under 100 words
 - Output ONLY the JSON"""
 
-    try:
-        # pyautogen 0.1.14 syntax: simpler agent creation
-        agent = AssistantAgent(
-            name="FileAnalyzer",
-            llm_config={"config_list": config_list},
-            system_message=system_message
-        )
-        logger.info("File analyzer agent created successfully")
-        return agent
-    except Exception as e:
-        logger.error(f"Failed to create file analyzer agent: {e}")
-        raise
+# Derived from the prompt text, so any edit to SYSTEM_MESSAGE automatically
+# invalidates cached responses produced by the previous prompt
+PROMPT_VERSION = hashlib.sha256(SYSTEM_MESSAGE.encode("utf-8")).hexdigest()[:8]
 
-def create_user_proxy():
+
+class FieldExtraction(BaseModel):
+    """
+    Structured output schema mirroring the OUTPUT FORMAT in SYSTEM_MESSAGE
+    
+    Example:
+        {"fields_extracted": ["Date", "Amount"], "field_count": 2, "notes": "date and numeric"}
+    """
+    fields_extracted: List[str]
+    field_count: int
+    notes: str
+
+
+class AnalysisResult(BaseModel):
+    """
+    Shape of a successful analyze_single_file() result
+    Used to revalidate cached payloads before they are returned
     """
-    Create user proxy for automated conversations
-    Compatible with pyautogen 0.1.14
+    success: bool
+    analysis: Dict[str, Any]
+    raw_response: str
+
+
+class ExtractionCache:
+    """
+    Content-addressable cache of LLM extraction responses
+    
+    Entries live in the shared CacheStore (Redis when REDIS_URL is set,
+    otherwise one JSON file per entry under cache/) keyed by the prompt
+    version plus a sha256 digest of everything that influences the model
+    output (model, prompt, file, input). A repeat upload of the same file
+    therefore skips the LLM round-trip in every worker.
+    
+    Example:
+        key = build_cache_key(MODEL_NAME, PROMPT_VERSION, "sales.xlsx", "Date,Amount", "")
+        cached = await extraction_cache.get(key)
+    """
+
+    def __init__(self, store: Optional[CacheStore] = None):
+        self._store = store
+
+    @property
+    def store(self) -> CacheStore:
+        """Created on first use so REDIS_URL from .env is already loaded"""
+        if self._store is None:
+            self._store = create_cache_store()
+        return self._store
+
+    @staticmethod
+    def _store_key(prompt_version: str, key: str) -> str:
+        return f"extraction:{prompt_version}:{key}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key, or None on a miss"""
+        try:
+            entry = await self.store.get(self._store_key(PROMPT_VERSION, key))
+        except Exception as e:
+            # An unavailable cache only costs an LLM call
+            logger.error("Failed to read extraction cache: %s", e)
+            return None
+        return entry.get("response") if entry else None
+
+    async def set(self, key: str, response: Dict[str, Any]) -> None:
+        """Store a response for the current prompt version"""
+        try:
+            await self.store.set(self._store_key(PROMPT_VERSION, key), {
+                "response": response,
+                "model": MODEL_NAME,
+                "prompt_version": PROMPT_VERSION,
+                "timestamp": time.time()
+            })
+        except Exception as e:
+            # A cache write failure must never fail the analysis itself
+            logger.error("Failed to persist extraction cache: %s", e)
+
+    async def invalidate(self, prompt_version: str, key: Optional[str] = None) -> int:
+        """
+        Remove entries produced by a given prompt version
+        
+        Args:
+            prompt_version: PROMPT_VERSION whose entries should be removed
+            key: Remove only this entry (if it belongs to prompt_version)
+            
+        Returns:
+            int: Number of entries removed
+        """
+        if key is not None:
+            return int(await self.store.delete(self._store_key(prompt_version, key)))
+        return await self.store.delete_prefix(f"extraction:{prompt_version}")
+
+
+def build_cache_key(*parts: str) -> str:
+    """
+    Build a sha256 cache key from several string parts
+    
+    Each part is prefixed with its 8-byte length so that e.g.
+    ("ab", "c") and ("a", "bc") can never produce the same key.
     
     Returns:
-        UserProxyAgent: Configured user proxy
+        str: Hex digest usable as a cache key
     """
-    try:
-        user_proxy = UserProxyAgent(
-            name="User",
-            human_input_mode="NEVER",
-            max_consecutive_auto_reply=5,
-            code_execution_config=False  # Disable code execution for this POC
+    encoded = []
+    for part in parts:
+        data = part.encode("utf-8")
+        encoded.append(len(data).to_bytes(8, "big") + data)
+    return hashlib.sha256(b"\x00".join(encoded)).hexdigest()
+
+
+# Module-level cache handle; entries are shared by all workers through the store
+extraction_cache = ExtractionCache()
+
+
+class SemanticCache:
+    """
+    In-memory cache that matches near-duplicate analysis requests
+    
+    The exact-hash cache misses when a user rewords their description
+    ("inventory data" vs "inventory records"). This cache stores one
+    unit-normalised embedding per analysed (fields, user_input) pair and
+    returns the stored result when the best cosine similarity reaches the
+    threshold. The result lists the fields themselves, so only entries with
+    exactly the same field list are candidates - similarity only absorbs
+    rewording of the user input.
+    
+    Example:
+        hit = get_semantic_cache().lookup(embedding, ["Date", "Amount"])
+    """
+
+    def __init__(self, threshold: float, max_entries: int = 1000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors: List[np.ndarray] = []
+        self._fields: List[Tuple[str, ...]] = []
+        self._results: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def lookup(self, embedding: np.ndarray, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the most similar cached result for the same fields, or None if nothing is close enough"""
+        candidates = [i for i, cached_fields in enumerate(self._fields) if cached_fields == tuple(fields)]
+        if not candidates:
+            return None
+        if self._matrix is None:
+            self._matrix = np.vstack(self._vectors)
+        scores = self._matrix[candidates] @ (embedding / np.linalg.norm(embedding))
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        logger.debug("Semantic cache hit (similarity %.3f)", scores[best])
+        return self._results[candidates[best]]
+
+    def add(self, embedding: np.ndarray, fields: List[str], result: Dict[str, Any]) -> None:
+        """Store a result under its embedding and field list, evicting the oldest entry when full"""
+        if len(self._vectors) >= self.max_entries:
+            self._vectors.pop(0)
+            self._fields.pop(0)
+            self._results.pop(0)
+        self._vectors.append(embedding / np.linalg.norm(embedding))
+        self._fields.append(tuple(fields))
+        self._results.append(result)
+        # Restack lazily on the next lookup
+        self._matrix = None
+
+
+# Created on first use so SEMANTIC_CACHE_THRESHOLD from .env is already loaded
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """
+    Return the process-wide semantic cache
+    
+    Returns:
+        SemanticCache: Cache using SEMANTIC_CACHE_THRESHOLD (default 0.92)
+    """
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache(float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")))
+    return _semantic_cache
+
+
+def build_semantic_text(fields: List[Any], user_input: str) -> str:
+    """
+    Build the text that is embedded for semantic cache lookups
+    
+    Example:
+        build_semantic_text(["Qty", "Item"], "inventory data") -> "Item Qty || inventory data"
+    """
+    return " ".join(sorted(str(field) for field in fields)) + " || " + (user_input or "")
+
+# Created on first use so OPENAI_API_KEY from .env is already loaded
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the process-wide async OpenAI client
+    
+    The client owns an HTTP connection pool, so it is shared across requests
+    rather than rebuilt for every analysis.
+    
+    Returns:
+        AsyncOpenAI: Configured OpenAI client
+    """
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            timeout=REQUEST_TIMEOUT
         )
-        logger.info("User proxy agent created successfully")
-        return user_proxy
-    except Exception as e:
-        logger.error(f"Failed to create user proxy: {e}")
-        raise
+    return _openai_client
+
 
-async def analyze_single_file(file_metadata: Dict[str, Any], user_input: str) -> Dict[str, Any]:
+async def embed_texts(texts: List[str]) -> List[np.ndarray]:
     """
-    Analyze a single Excel file using AutoGen agents
-    Compatible with pyautogen 0.1.14
+    Embed several strings with EMBEDDING_MODEL in a single API request
+    
+    Returns:
+        List[np.ndarray]: One embedding vector per input, in input order
+    """
+    response = await get_openai_client().embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    ordered = sorted(response.data, key=lambda item: item.index)
+    return [np.array(item.embedding, dtype=np.float32) for item in ordered]
+
+
+async def embed_text(text: str) -> np.ndarray:
+    """
+    Embed a single string with EMBEDDING_MODEL
+    
+    Returns:
+        np.ndarray: Embedding vector
+    """
+    return (await embed_texts([text]))[0]
+
+
+def is_trivial_field_list(fields: List[Any]) -> bool:
+    """
+    Check whether a field list is small and plain enough to extract locally
+    
+    Example:
+        is_trivial_field_list(["Date", "Amount"]) -> True
+    """
+    return len(fields) <= LOCAL_EXTRACTION_MAX_FIELDS and all(
+        str(field).isascii() and len(str(field)) < LOCAL_EXTRACTION_MAX_NAME_LENGTH for field in fields
+    )
+
+async def analyze_single_file(
+    file_metadata: Dict[str, Any],
+    user_input: str,
+    embedding: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a single Excel file with one structured-output OpenAI call
+    
+    The response is constrained to the FieldExtraction schema; if it still
+    fails validation the error is fed back to the model and the call is
+    retried up to MAX_EXTRACTION_RETRIES times. Small lists of plain ASCII
+    field names are answered locally without calling the API at all.
     
     Args:
         file_metadata: File information including filename and fields
         user_input: User's description of the file
+        embedding: Precomputed semantic cache embedding (e.g. from a batch
+            request); computed on demand when omitted
         
     Returns:
         Dict with analysis results or error information
     """
+    # Field names as strings (headers may be numbers such as a year), used
+    # for the local extraction, cache keys and the prompt alike
+    fields = [str(field) for field in file_metadata.get('fields', [])]
+    
+    # Trivial field lists are answered locally without any cache or LLM call
+    if is_trivial_field_list(fields):
+        analysis = {
+            "fields_extracted": fields,
+            "field_count": len(fields),
+            "notes": "auto-extracted"
+        }
+        return {
+            "success": True,
+            "analysis": analysis,
+            "raw_response": json.dumps(analysis)
+        }
+    
+    # Short-circuit repeat analyses before calling the LLM
+    cache_key = build_cache_key(
+        MODEL_NAME,
+        PROMPT_VERSION,
+        file_metadata.get('filename', 'Unknown'),
+        json.dumps(sorted(fields)),
+        user_input or ""
+    )
+    cached = await extraction_cache.get(cache_key)
+    if cached is not None:
+        try:
+            result = AnalysisResult.model_validate(cached).model_dump()
+            logger.debug("Extraction cache hit for %s", file_metadata.get('filename', 'Unknown'))
+            return result
+        except ValidationError:
+            # Schema-incompatible entry - fall through to a fresh analysis
+            logger.debug("Discarding invalid extraction cache entry")
+
+    # Exact miss - look for a near-duplicate request before calling the LLM.
+    # Embedding failures only disable this layer, never the analysis itself.
+    try:
+        if embedding is None:
+            embedding = await embed_text(build_semantic_text(fields, user_input))
+        similar = get_semantic_cache().lookup(embedding, fields)
+        if similar is not None:
+            return similar
+    except Exception as e:
+        logger.error("Semantic cache lookup failed: %s", e)
+
     try:
-        # Create fresh agents for this analysis session (no shared state)
-        analyzer = create_file_analyzer()
-        user_proxy = create_user_proxy()
-        
-        # Clear any previous conversation state
-        analyzer.reset()
-        user_proxy.reset()
-        
         # Build conversation starter with context
         conversation_starter = f"""
         Extract fields from this Excel file:
 
         File: {file_metadata.get('filename', 'Unknown')}
-        Fields found: {', '.join(file_metadata.get('fields', []))}
+        Fields found: {', '.join(fields)}
         
         List the fields and output JSON format.
         """
         
-        # Debug: Log what we're sending to the agent
-        logger.info(f"=== DEBUG: Agent conversation starter ===")
-        logger.info(f"File: {file_metadata.get('filename', 'Unknown')}")
-        logger.info(f"Fields: {file_metadata.get('fields', [])}")
-        logger.info(f"User input: {user_input}")
-        logger.info(f"Conversation starter: {conversation_starter}")
-        
-        # Initiate chat - only 1 turn to get analysis and stop
-        user_proxy.initiate_chat(
-            analyzer,
-            message=conversation_starter,
-            max_turns=1
-        )
-        
-        # Extract the last message from the analyzer
-        # AutoGen 0.4.0: Check both possible message locations using objects, not names
-        messages = None
-        message_source = None
+        # Debug: Log what we're sending to the model (skipped unless DEBUG is enabled)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Conversation starter for %s (user input: %r): %s",
+                         file_metadata.get('filename', 'Unknown'), user_input, conversation_starter)
         
-        if analyzer in user_proxy.chat_messages:
-            messages = user_proxy.chat_messages[analyzer]
-            message_source = f"user_proxy.chat_messages[analyzer]"
-        elif user_proxy in analyzer.chat_messages:
-            messages = analyzer.chat_messages[user_proxy]
-            message_source = f"analyzer.chat_messages[user_proxy]"
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": conversation_starter}
+        ]
         
-        if messages:
-            logger.info(f"Found messages in {message_source}, count: {len(messages)}")
-            last_message = messages[-1]["content"]
-            logger.info(f"Agent response received: {last_message[:200]}...")
-        else:
-            # Debug: Log what we found in both locations
-            logger.error(f"No messages found in either location")
-            logger.error(f"user_proxy.chat_messages keys: {list(user_proxy.chat_messages.keys())}")
-            logger.error(f"analyzer.chat_messages keys: {list(analyzer.chat_messages.keys())}")
-            return {
-                "success": False,
-                "error": "No response from analyzer agent"
-            }
+        for attempt in range(MAX_EXTRACTION_RETRIES + 1):
+            try:
+                completion = await get_openai_client().beta.chat.completions.parse(
+                    model=MODEL_NAME,
+                    messages=messages,
+                    response_format=FieldExtraction
+                )
+            except ValidationError as e:
+                if attempt == MAX_EXTRACTION_RETRIES:
+                    raise
+                # Feed the validation error back so the model can correct itself
+                logger.info("Extraction failed validation (attempt %d): %s", attempt + 1, e)
+                messages.append({
+                    "role": "user",
+                    "content": f"Your previous response did not match the required JSON schema: {e}. Try again."
+                })
+                await asyncio.sleep(1.0 * (attempt + 1))
+                continue
             
-        # Try to parse JSON response
-        try:
-            analysis_result = json.loads(last_message)
-            return {
-                "success": True, 
-                "analysis": analysis_result,
-                "raw_response": last_message
-            }
-        except json.JSONDecodeError:
-            # Return structured response even if JSON parsing fails
-            return {
-                "success": True,
-                "analysis": {
-                    "file_purpose": "Analysis completed",
-                    "fields": {},
-                    "raw_response": last_message
-                },
-                "raw_response": last_message
-            }
+            message = completion.choices[0].message
+            if message.parsed is None:
+                logger.error("No structured response from analyzer: %s", message.refusal)
+                return {
+                    "success": False,
+                    "error": "No response from analyzer agent"
+                }
+            break
+        
+        result = {
+            "success": True,
+            "analysis": message.parsed.model_dump(),
+            "raw_response": message.content
+        }
+        await extraction_cache.set(cache_key, result)
+        if embedding is not None:
+            get_semantic_cache().add(embedding, fields, result)
+        return result
             
     except Exception as e:
-        logger.error(f"File analysis failed: {e}")
+        logger.error("File analysis failed: %s", e)
         return {
             "success": False, 
             "error": f"Agent conversation failed: {str(e)}"
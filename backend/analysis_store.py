@@ -0,0 +1,273 @@
+"""
+Analysis result and response cache storage for Phase 2A
+ONLY handle saving and loading analysis results and cached responses
+DO NOT add analysis logic or agent interactions
+"""
+import os
+import re
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol
+from uuid import uuid4
+
+import orjson
+
+# Cache keys are ":"-separated namespaces made of these characters only, so
+# they map safely onto file paths and Redis key patterns
+_KEY_PART_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Redis clients by URL, so every store configured with the same URL shares
+# one connection pool
+_redis_clients: Dict[str, Any] = {}
+
+
+def _get_redis(redis_url: str):
+    """Return the shared async Redis client for redis_url"""
+    if redis_url not in _redis_clients:
+        # Imported lazily so Redis is only required when it is configured
+        import redis.asyncio as redis
+        
+        _redis_clients[redis_url] = redis.from_url(redis_url)
+    return _redis_clients[redis_url]
+
+
+def _key_parts(key: str) -> List[str]:
+    """Split a cache key into its namespaces, rejecting unsafe characters"""
+    parts = key.split(":")
+    if not all(_KEY_PART_RE.match(part) for part in parts):
+        raise ValueError(f"Invalid cache key: {key}")
+    return parts
+
+
+class AnalysisStore(Protocol):
+    """
+    Interface shared by all analysis storage backends
+
+    Example:
+        total = await store.append("default_session", {"file": "sales.xlsx"})
+        results = await store.get_all("default_session")
+    """
+
+    async def append(self, session_id: str, analysis: Dict[str, Any]) -> int:
+        """Append one analysis to a session and return the session's total count"""
+        ...
+
+    async def get_all(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return every analysis saved for a session (empty list if none)"""
+        ...
+
+
+class MemoryAnalysisStore:
+    """
+    Process-local store used when REDIS_URL is not configured
+
+    Sessions are kept in least-recently-used order and the oldest session is
+    evicted once max_sessions is reached, so memory stays bounded.
+    """
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+    async def append(self, session_id: str, analysis: Dict[str, Any]) -> int:
+        results = self._sessions.setdefault(session_id, [])
+        self._sessions.move_to_end(session_id)
+        results.append(analysis)
+
+        # Evict least recently used sessions beyond the cap
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return len(results)
+
+    async def get_all(self, session_id: str) -> List[Dict[str, Any]]:
+        if session_id not in self._sessions:
+            return []
+        self._sessions.move_to_end(session_id)
+        return list(self._sessions[session_id])
+
+
+class RedisAnalysisStore:
+    """
+    Redis-backed store shared by every uvicorn worker
+
+    Each session is a Redis list of JSON documents whose TTL is refreshed on
+    every save, so abandoned sessions expire on their own.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int = 86400):
+        self.ttl_seconds = ttl_seconds
+        self._redis = _get_redis(redis_url)
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"analysis:{session_id}"
+
+    async def append(self, session_id: str, analysis: Dict[str, Any]) -> int:
+        key = self._key(session_id)
+        total = await self._redis.rpush(key, orjson.dumps(analysis))
+        await self._redis.expire(key, self.ttl_seconds)
+        return total
+
+    async def get_all(self, session_id: str) -> List[Dict[str, Any]]:
+        items = await self._redis.lrange(self._key(session_id), 0, -1)
+        return [orjson.loads(item) for item in items]
+
+
+def create_analysis_store() -> AnalysisStore:
+    """
+    Create the analysis store configured by the environment
+
+    Uses Redis when REDIS_URL is set (TTL from ANALYSIS_TTL_SECONDS, default
+    one day), otherwise falls back to a bounded in-memory store.
+
+    Returns:
+        AnalysisStore: Backend for saving analysis results
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisAnalysisStore(redis_url, int(os.getenv("ANALYSIS_TTL_SECONDS", "86400")))
+    return MemoryAnalysisStore()
+
+
+class CacheStore(Protocol):
+    """
+    Key-value interface shared by all response cache backends
+    
+    Keys are ":"-separated namespaces, so everything under a namespace can be
+    removed at once (e.g. every entry produced by one prompt version).
+    
+    Example:
+        await store.set("extraction:1a2b3c4d:ff00", {"response": {...}})
+        entry = await store.get("extraction:1a2b3c4d:ff00")
+        removed = await store.delete_prefix("extraction:1a2b3c4d")
+    """
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the value stored under key, or None if there is none"""
+        ...
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store value under key, replacing any previous value"""
+        ...
+
+    async def delete(self, key: str) -> bool:
+        """Remove one key and return whether it existed"""
+        ...
+
+    async def delete_prefix(self, prefix: str) -> int:
+        """Remove every key inside the namespace prefix and return how many were removed"""
+        ...
+
+
+class FileCacheStore:
+    """
+    Cache store used when REDIS_URL is not configured
+    
+    Each entry is its own JSON file (key "a:b:c" is stored at <root>/a/b/c.json),
+    written atomically, so workers sharing the directory never overwrite each
+    other's entries and deletions are seen by all of them. File I/O runs in
+    worker threads to keep the event loop free.
+    """
+
+    def __init__(self, root: str = "cache"):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        *namespaces, name = _key_parts(key)
+        return self.root.joinpath(*namespaces, f"{name}.json")
+
+    @staticmethod
+    def _read(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return orjson.loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def _write(path: Path, value: Dict[str, Any]) -> None:
+        # Write a uniquely named temp file, then rename it into place
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+        tmp_path.write_bytes(orjson.dumps(value))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _unlink(path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _unlink_tree(directory: Path) -> int:
+        removed = 0
+        for path in directory.rglob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read, self._path(key))
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, self._path(key), value)
+
+    async def delete(self, key: str) -> bool:
+        return await asyncio.to_thread(self._unlink, self._path(key))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return await asyncio.to_thread(self._unlink_tree, self.root.joinpath(*_key_parts(prefix)))
+
+
+class RedisCacheStore:
+    """
+    Redis-backed cache store shared by every uvicorn worker
+    
+    Uses the same client (connection pool) as RedisAnalysisStore; each entry
+    is one JSON string, optionally expiring after ttl_seconds.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds
+        self._redis = _get_redis(redis_url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        _key_parts(key)
+        value = await self._redis.get(key)
+        return orjson.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        _key_parts(key)
+        await self._redis.set(key, orjson.dumps(value), ex=self.ttl_seconds)
+
+    async def delete(self, key: str) -> bool:
+        _key_parts(key)
+        return bool(await self._redis.delete(key))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        _key_parts(prefix)
+        removed = 0
+        async for key in self._redis.scan_iter(match=f"{prefix}:*"):
+            removed += await self._redis.delete(key)
+        return removed
+
+
+def create_cache_store() -> CacheStore:
+    """
+    Create the response cache store configured by the environment
+    
+    Uses Redis when REDIS_URL is set (shared with the analysis store),
+    otherwise one JSON file per entry under the local cache directory.
+    
+    Returns:
+        CacheStore: Backend for cached responses
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisCacheStore(redis_url)
+    return FileCacheStore()
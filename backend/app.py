@@ -1,23 +1,57 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Any, Optional, Tuple
 import os
-import json
+import re
+import asyncio
+import hashlib
+import secrets
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from datetime import datetime
+from itertools import chain
+from uuid import uuid4
+import aiofiles
+import aiofiles.os
+import orjson
 from dotenv import load_dotenv
 
 # Import Phase 1 modules
-from excel_processor import extract_file_metadata, validate_excel_files
-from sqlite_manager import create_memory_database
+from excel_processor import FileEntry, extract_file_metadata, validate_excel_files
+from analysis_store import create_analysis_store
 
 # Import Phase 2A modules
-from agents.file_analyzer import analyze_single_file
+from agents.file_analyzer import (
+    analyze_single_file, build_semantic_text, embed_texts, extraction_cache, is_trivial_field_list
+)
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """App startup and shutdown hooks"""
+    # Create the stored_queries directories once instead of on every upload
+    os.makedirs("stored_queries/files", exist_ok=True)
+    
+    yield
+    
+    # Write any buffered chat turns before the process exits
+    for task in _flush_tasks.values():
+        task.cancel()
+    _flush_tasks.clear()
+    for json_path in list(_pending_history):
+        await _flush_history(json_path)
+
 # Create FastAPI app
-app = FastAPI(title="AI Excel Reporting API", version="1.0.0")
+# ORJSONResponse serializes every endpoint's JSON with orjson instead of stdlib json
+app = FastAPI(
+    title="AI Excel Reporting API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # Configure CORS for React frontend
 app.add_middleware(
@@ -28,8 +62,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for analysis results (session-based)
-analysis_storage = {}
+# Storage for analysis results (session-based): Redis when REDIS_URL is set, else in-memory
+analysis_storage = create_analysis_store()
+
+# Uploads are copied to disk in chunks of this size, never read whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Last /list-json-files result and the stored_queries mtime it was built at
+_json_listing_cache: Dict[str, Any] = {"mtime_ns": None, "files": []}
+
+# Affirmative replies to the field confirmation question, matched as whole
+# words so e.g. "lookup" does not count as "ok"
+_AFFIRM_RE = re.compile(r"\b(?:yes|sure|correct|that's right|yep|ok|good|right)\b", re.IGNORECASE)
+
+# Cap on concurrent LLM analyses so batch requests stay under the OpenAI rate limit
+llm_semaphore = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_LLM", "8")))
+
+# Several workers only share analysis results through Redis, so default
+# to a single worker when REDIS_URL is not configured
+WORKERS = int(os.getenv("WORKERS", "4" if os.getenv("REDIS_URL") else "1"))
+
+# Chat turns are buffered in memory and appended to their log after this many
+# idle seconds. Buffers are per process, and a turn buffered in one worker is
+# invisible to the others, so with several workers every turn is always
+# written through immediately regardless of CHAT_FLUSH_DELAY
+CHAT_FLUSH_DELAY = float(os.getenv("CHAT_FLUSH_DELAY", "2.0")) if WORKERS == 1 else 0.0
+if WORKERS > 1 and float(os.getenv("CHAT_FLUSH_DELAY", "0")) > 0:
+    print(f"CHAT_FLUSH_DELAY ignored with {WORKERS} workers; chat turns are written through")
+
+# Write-behind buffer: turns not yet in their log and the pending flush
+# task, both keyed by JSON path. The lock keeps reads from racing a flush
+_pending_history: Dict[str, List[Dict[str, Any]]] = {}
+_flush_tasks: Dict[str, asyncio.Task] = {}
+_history_lock = asyncio.Lock()
 
 @app.get("/")
 async def root():
@@ -41,11 +106,205 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "environment": os.getenv("ENVIRONMENT", "development")}
 
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Write a JSON document to disk, indented for readability"""
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def _history_path(json_path: str) -> str:
+    """Path of the append-only conversation log that sits next to a JSON file"""
+    return os.path.splitext(json_path)[0] + ".jsonl"
+
+def _apply_history_entry(json_data: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Apply one conversation turn (field update + history record) to the JSON data"""
+    json_data[entry["field"]] = entry["value"]
+    json_data.setdefault("conversation_history", []).append({
+        "step": entry["step"],
+        "question": entry["question"],
+        "user_response": entry["user_response"],
+        "timestamp": entry["timestamp"]
+    })
+
+async def _load_conversation(json_path: str) -> Dict[str, Any]:
+    """
+    Read a JSON file and replay any turns logged since it was last rewritten
+    
+    Raises:
+        FileNotFoundError: If the JSON file does not exist
+    """
+    async with _history_lock:
+        async with aiofiles.open(json_path, 'rb') as f:
+            json_data = orjson.loads(await f.read())
+        try:
+            async with aiofiles.open(_history_path(json_path), 'rb') as f:
+                history = await f.read()
+        except FileNotFoundError:
+            history = b""
+        entries = [orjson.loads(line) for line in history.splitlines() if line.strip()]
+        
+        # Turns still waiting in the write-behind buffer come after the log
+        entries.extend(_pending_history.get(json_path, ()))
+    
+    for entry in entries:
+        _apply_history_entry(json_data, entry)
+    return json_data
+
+async def _flush_history(json_path: str) -> None:
+    """Append every buffered turn for a JSON file to its log in one write"""
+    async with _history_lock:
+        entries = _pending_history.pop(json_path, None)
+        if entries:
+            async with aiofiles.open(_history_path(json_path), 'ab') as f:
+                await f.write(b"".join(orjson.dumps(entry) + b"\n" for entry in entries))
+
+async def _debounced_flush(json_path: str, delay: float) -> None:
+    """Flush a JSON file's buffered turns once no new turn has arrived for delay seconds"""
+    await asyncio.sleep(delay)
+    _flush_tasks.pop(json_path, None)
+    await _flush_history(json_path)
+
+async def _append_history(json_path: str, entry: Dict[str, Any]) -> None:
+    """Buffer one conversation turn; it is appended to the log after CHAT_FLUSH_DELAY"""
+    _pending_history.setdefault(json_path, []).append(entry)
+    if CHAT_FLUSH_DELAY <= 0:
+        await _flush_history(json_path)
+        return
+    
+    # Restart the debounce timer so a burst of turns becomes one write
+    task = _flush_tasks.pop(json_path, None)
+    if task:
+        task.cancel()
+    _flush_tasks[json_path] = asyncio.create_task(_debounced_flush(json_path, CHAT_FLUSH_DELAY))
+
+async def _compact_conversation(json_path: str, json_data: Dict[str, Any]) -> None:
+    """Fold the logged and buffered turns into the JSON file and remove the log"""
+    task = _flush_tasks.pop(json_path, None)
+    if task:
+        task.cancel()
+    async with _history_lock:
+        # Buffered turns are already part of json_data, so they are dropped
+        _pending_history.pop(json_path, None)
+        
+        # Write a temp file and rename it over the original: the rewrite is
+        # atomic, and the rename bumps the stored_queries mtime so every
+        # worker's cached listing picks up the file's new ctime
+        tmp_path = json_path + ".tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+        await aiofiles.os.replace(tmp_path, json_path)
+        _invalidate_json_listing()
+        try:
+            await aiofiles.os.remove(_history_path(json_path))
+        except FileNotFoundError:
+            pass
+
+def _scan_json_files() -> List[str]:
+    """List JSON filenames in stored_queries, newest first"""
+    # List all JSON files in stored_queries directory; scandir yields each
+    # name together with its stat, so no extra per-file lookups are needed
+    with os.scandir("stored_queries") as it:
+        entries = [(entry.name, entry.stat().st_ctime) for entry in it
+                   if entry.name.endswith(".json") and entry.is_file()]
+    
+    # Sort files by creation time (newest first)
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return [name for name, _ in entries]
+
+def _invalidate_json_listing() -> None:
+    """
+    Force the next listing to rescan stored_queries
+    
+    Rewriting a JSON file changes its ctime (the sort key); callers that
+    rewrite files reset this process's cache right away rather than relying
+    on the directory mtime alone.
+    """
+    _json_listing_cache["mtime_ns"] = None
+
+def _cached_json_files() -> List[str]:
+    """Return the JSON file listing, rescanning only when stored_queries has changed"""
+    try:
+        mtime_ns = os.stat("stored_queries").st_mtime_ns
+    except FileNotFoundError:
+        return []
+    
+    # Adding, removing or renaming a file bumps the directory mtime; in-place
+    # rewrites reset the cache through _invalidate_json_listing()
+    if _json_listing_cache["mtime_ns"] != mtime_ns:
+        _json_listing_cache["files"] = _scan_json_files()
+        _json_listing_cache["mtime_ns"] = mtime_ns
+    return list(_json_listing_cache["files"])
+
+async def _persist_one(file: UploadFile, timestamp: str) -> Tuple[str, List[str], Dict[str, Any]]:
+    """
+    Save one uploaded Excel file, extract its metadata and create its JSON file
+    
+    Args:
+        file: Validated uploaded Excel file
+        timestamp: Upload timestamp shared by every file in the request
+        
+    Returns:
+        Tuple of the file's JSON filename, its combined fields and its extracted metadata
+    """
+    # Create unique filename with timestamp; the random suffix keeps files
+    # uploaded within the same second from overwriting each other
+    base_name = os.path.splitext(file.filename)[0]  # Remove .xlsx extension
+    stem = f"{base_name}_{timestamp}_{uuid4().hex[:8]}"
+    json_filename = f"{stem}.json"
+    excel_filename = f"{stem}.xlsx"
+    
+    json_path = f"stored_queries/{json_filename}"
+    excel_path = f"stored_queries/files/{excel_filename}"
+    
+    # Save the actual Excel file with timestamp, streaming it in
+    # chunks so at most UPLOAD_CHUNK_SIZE bytes are held in memory, and
+    # hash the content in the same pass for the metadata cache
+    hasher = hashlib.blake2b(digest_size=32)
+    async with aiofiles.open(excel_path, 'wb') as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            await f.write(chunk)
+    
+    # Extract metadata from the saved copy (the upload is read only once);
+    # parsing is blocking, so it runs in a worker thread
+    file_metadata = await asyncio.to_thread(extract_file_metadata, excel_path, hasher.hexdigest())
+    
+    # Extract fields from sheets, removing duplicates while preserving order
+    all_fields = list(dict.fromkeys(chain.from_iterable(
+        sheet_data.get("fields", []) for sheet_data in file_metadata.get("sheets", {}).values()
+    )))
+    
+    # Create JSON structure
+    json_data = {
+        "filename": excel_filename,  # Reference the saved Excel file
+        "original_filename": file.filename,  # Keep original name for reference
+        "uploaded_at": datetime.now().isoformat(),
+        "file_size_bytes": file.size,
+        "file_size_mb": round(file.size / (1024 * 1024), 2),
+        "fields": all_fields,
+        "record_count": file_metadata.get("sheets", {}).get("Sheet1", {}).get("row_count", 0),
+        "data_types": file_metadata.get("sheets", {}).get("Sheet1", {}).get("types", {}),
+        "user_description": "",
+        "reuse_regularly": False,
+        "process_name": "",
+        "conversation_history": [],
+        "analysis_complete": False,
+        "file_path": excel_path,  # Store the path to the saved Excel file
+        "json_path": json_path    # Store the path to the JSON metadata
+    }
+    
+    # Save JSON file
+    await asyncio.to_thread(_write_json, json_path, json_data)
+    _invalidate_json_listing()
+    
+    print(f"Saved Excel file: {excel_path}")
+    print(f"Created JSON file: {json_path}")
+    return json_filename, all_fields, file_metadata
+
 @app.post("/upload")
 async def upload_files(files: List[UploadFile] = File(...)):
     """File upload endpoint with validation and metadata extraction"""
     try:
-        # Validate files using Phase 1 module
+        # Validate files using Phase 1 module (no file content is read yet)
         validation = validate_excel_files(files)
         
         if validation["errors"]:
@@ -54,110 +313,34 @@ async def upload_files(files: List[UploadFile] = File(...)):
         if not validation["valid_files"]:
             raise HTTPException(status_code=400, detail="No valid files provided")
         
-        # Extract metadata using Phase 1 module
-        metadata = extract_file_metadata(files)
+        # One timestamp for the whole upload
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
         
-        # Create in-memory database for session (Phase 1 foundation)
-        db_conn = create_memory_database()
+        # Save and parse every file concurrently so their disk I/O and parsing overlap
+        results = await asyncio.gather(*(_persist_one(file, timestamp) for file in validation["valid_files"]))
         
-        # Create JSON file for each uploaded file
-        import json
-        import os
-        from datetime import datetime
-        
-        # Ensure the files directory exists
-        os.makedirs("stored_queries/files", exist_ok=True)
-        
-        for file in validation["valid_files"]:
-            file_metadata = metadata.get(file.filename, {})
-            
-            # Create unique filename with timestamp
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-            base_name = os.path.splitext(file.filename)[0]  # Remove .xlsx extension
-            json_filename = f"{base_name}_{timestamp}.json"
-            excel_filename = f"{base_name}_{timestamp}.xlsx"
-            
-            json_path = f"stored_queries/{json_filename}"
-            excel_path = f"stored_queries/files/{excel_filename}"
-            
-            # Save the actual Excel file with timestamp
-            with open(excel_path, 'wb') as f:
-                # Read file content and write to disk
-                content = await file.read()
-                f.write(content)
-                # Reset file pointer for later processing
-                await file.seek(0)
-            
-            # Extract fields from sheets
-            all_fields = []
-            if "sheets" in file_metadata:
-                for sheet_name, sheet_data in file_metadata["sheets"].items():
-                    if "fields" in sheet_data:
-                        all_fields.extend(sheet_data["fields"])
-                # Remove duplicates while preserving order
-                all_fields = list(dict.fromkeys(all_fields))
-            
-            # Create JSON structure
-            json_data = {
-                "filename": excel_filename,  # Reference the saved Excel file
-                "original_filename": file.filename,  # Keep original name for reference
-                "uploaded_at": datetime.now().isoformat(),
-                "file_size_bytes": file.size,
-                "file_size_mb": round(file.size / (1024 * 1024), 2),
-                "fields": all_fields,
-                "record_count": file_metadata.get("sheets", {}).get("Sheet1", {}).get("row_count", 0),
-                "data_types": file_metadata.get("sheets", {}).get("Sheet1", {}).get("types", {}),
-                "user_description": "",
-                "reuse_regularly": False,
-                "process_name": "",
-                "conversation_history": [],
-                "analysis_complete": False,
-                "file_path": excel_path,  # Store the path to the saved Excel file
-                "json_path": json_path    # Store the path to the JSON metadata
-            }
-            
-            # Save JSON file
-            with open(json_path, 'w') as f:
-                json.dump(json_data, f, indent=2)
-            
-            print(f"Saved Excel file: {excel_path}")
-            print(f"Created JSON file: {json_path}")
-        
-        # Return files array that frontend expects for AgentChat
+        # Build the files array that frontend expects for AgentChat in a single pass
         files_data = []
-        for i, file in enumerate(validation["valid_files"]):
-            file_metadata = metadata.get(file.filename, {})
-            
-            # Combine fields from all sheets for the frontend
-            all_fields = []
-            if "sheets" in file_metadata:
-                for sheet_name, sheet_data in file_metadata["sheets"].items():
-                    if "fields" in sheet_data:
-                        all_fields.extend(sheet_data["fields"])
-                # Remove duplicates while preserving order
-                all_fields = list(dict.fromkeys(all_fields))
-            
-            # Create JSON filename for this file
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-            base_name = os.path.splitext(file.filename)[0]
-            json_filename = f"{base_name}_{timestamp}.json"
-            
-            files_data.append({
-                "name": file.filename,  # Frontend expects 'name' property
-                "size": file.size,
-                "content_type": file.content_type,
-                "fields": all_fields,  # Combined fields from all sheets
-                "sheets": file_metadata.get("sheets", []),
-                "file_index": i,
-                "json_filename": json_filename  # Include JSON filename for ChatAgent
-            })
+        for i, (file, (json_filename, all_fields, file_metadata)) in enumerate(zip(validation["valid_files"], results)):
+            files_data.append(FileEntry(
+                name=file.filename,  # Frontend expects 'name' property
+                size=file.size,
+                content_type=file.content_type,
+                # Combined fields from all sheets, sorted once here so analysis
+                # cache keys are stable regardless of column order
+                fields=tuple(sorted(set(all_fields), key=str)),
+                sheets=file_metadata.get("sheets", {}),
+                file_index=i,
+                json_filename=json_filename  # Include JSON filename for ChatAgent
+            ))
         
         return {
             "success": True,
             "message": f"Successfully processed {len(validation['valid_files'])} files",
-            "files": files_data,  # This is what AgentChat expects
-            "validation": validation,
-            "metadata": metadata,
+            "files": [asdict(entry) for entry in files_data],  # This is what AgentChat expects
+            # Per-sheet metadata already travels in each file entry, so only
+            # the rejections are reported from validation
+            "rejected_files": validation["rejected_files"],
             "database_ready": True
         }
         
@@ -193,14 +376,13 @@ async def chat_agent_conversation(request: Dict[str, Any]):
         # Construct full path to JSON file
         json_path = f"stored_queries/{json_filename}"
         
-        # Check if JSON file exists
-        if not os.path.exists(json_path):
+        # Read current JSON data without blocking the event loop; a missing
+        # file is detected by the open itself rather than a separate exists check
+        try:
+            json_data = await _load_conversation(json_path)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail=f"JSON file not found: {json_filename}")
         
-        # Read current JSON data
-        with open(json_path, 'r') as f:
-            json_data = json.load(f)
-        
         # Initialize conversation flow
         conversation_flow = [
             {
@@ -231,8 +413,7 @@ async def chat_agent_conversation(request: Dict[str, Any]):
             # Process response based on field type
             if field_name == "user_confirmation":
                 # Check if response is affirmative
-                affirmative_responses = ["yes", "sure", "correct", "that's right", "yep", "ok", "good", "right"]
-                is_affirmative = any(response in user_response.lower() for response in affirmative_responses)
+                is_affirmative = bool(_AFFIRM_RE.search(user_response))
                 
                 if not is_affirmative:
                     return {
@@ -240,28 +421,26 @@ async def chat_agent_conversation(request: Dict[str, Any]):
                         "error": "Please confirm that the field analysis is correct before proceeding"
                     }
                 
-                json_data[field_name] = True
+                value = True
             elif field_name == "user_description":
-                json_data[field_name] = user_response.strip()
-            elif field_name == "analysis_complete":
-                json_data[field_name] = True
+                value = user_response.strip()
+            else:
+                value = True
             
-            # Update conversation history
-            if "conversation_history" not in json_data:
-                json_data["conversation_history"] = []
-            
-            json_data["conversation_history"].append({
+            # Record the turn as a single appended line; the JSON file itself
+            # is only rewritten once the analysis completes
+            entry = {
                 "step": conversation_step,
                 "question": current_step["question"],
                 "user_response": user_response,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            # Save updated JSON
-            with open(json_path, 'w') as f:
-                json.dump(json_data, f, indent=2)
+                "timestamp": datetime.now().isoformat(),
+                "field": field_name,
+                "value": value
+            }
+            _apply_history_entry(json_data, entry)
+            await _append_history(json_path, entry)
             
-            print(f"Updated JSON file: {json_path} with {field_name}")
+            print(f"Logged {field_name} for {json_path}")
         
         # Determine next step
         if conversation_step == 0:
@@ -295,8 +474,7 @@ async def chat_agent_conversation(request: Dict[str, Any]):
         
         # Save final state if completed
         if conversation_status == "completed":
-            with open(json_path, 'w') as f:
-                json.dump(json_data, f, indent=2)
+            await _compact_conversation(json_path, json_data)
         
         return {
             "success": True,
@@ -315,6 +493,109 @@ async def chat_agent_conversation(request: Dict[str, Any]):
         print(f"Error in chat agent conversation: {e}")
         raise HTTPException(status_code=500, detail=f"Chat agent conversation failed: {str(e)}")
 
+@app.post("/analyze-files")
+async def analyze_files(request: Dict[str, Any]):
+    """
+    Analyze several files concurrently so their LLM calls overlap
+    
+    Args:
+        request: Dict containing files, a list of {"file_info": {...}, "user_input": "..."}
+        
+    Returns:
+        Dict with one analysis result per file, in request order
+    """
+    try:
+        files = request.get("files", [])
+        
+        # Validate required fields
+        if not files:
+            raise HTTPException(status_code=400, detail="Missing files")
+        
+        # Embed every file that may reach the LLM in one request instead of one per file
+        embeddings = [None] * len(files)
+        pending = [
+            i for i, f in enumerate(files)
+            if not is_trivial_field_list(f.get("file_info", {}).get("fields", []))
+        ]
+        if pending:
+            try:
+                vectors = await embed_texts([
+                    build_semantic_text(files[i].get("file_info", {}).get("fields", []), files[i].get("user_input", ""))
+                    for i in pending
+                ])
+                for i, vector in zip(pending, vectors):
+                    embeddings[i] = vector
+            except Exception as e:
+                # Each file falls back to embedding itself inside analyze_single_file
+                print(f"Batch embedding failed: {e}")
+        
+        async def analyze_limited(file_request: Dict[str, Any], embedding) -> Dict[str, Any]:
+            # Wait for a free LLM slot before starting this file's analysis
+            async with llm_semaphore:
+                return await analyze_single_file(
+                    file_request.get("file_info", {}),
+                    file_request.get("user_input", ""),
+                    embedding=embedding
+                )
+        
+        # analyze_single_file reports its own failures, so gather never sees exceptions
+        results = await asyncio.gather(*(analyze_limited(f, e) for f, e in zip(files, embeddings)))
+        
+        return {
+            "success": True,
+            "results": results,
+            "count": len(results),
+            "message": f"Analyzed {len(results)} files"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error analyzing files: {e}")
+        raise HTTPException(status_code=500, detail=f"File analysis failed: {str(e)}")
+
+@app.delete("/cache/{prompt_version}")
+async def invalidate_cache(
+    prompt_version: str,
+    cache_key: Optional[str] = None,
+    x_admin_key: Optional[str] = Header(default=None)
+):
+    """
+    Remove cached extractions produced by an old prompt version (admin only)
+    
+    Entries are deleted from the shared cache store, so the removal applies
+    to every worker and the returned count covers all of them.
+    
+    Args:
+        prompt_version: PROMPT_VERSION whose entries should be removed
+        cache_key: Optional query parameter to remove a single entry
+        x_admin_key: Must match ADMIN_API_KEY (sent as the X-Admin-Key header)
+        
+    Returns:
+        Dict with the number of removed entries
+    """
+    # The endpoint stays disabled unless an admin key is configured
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if not admin_key or not secrets.compare_digest(x_admin_key or "", admin_key):
+        raise HTTPException(status_code=403, detail="Admin API key required")
+    
+    try:
+        removed = await extraction_cache.invalidate(prompt_version, cache_key)
+        
+        return {
+            "success": True,
+            "removed": removed,
+            "prompt_version": prompt_version,
+            "message": f"Removed {removed} cached entries"
+        }
+        
+    except ValueError as e:
+        # Prompt versions and cache keys are hex digests; anything else is rejected
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error invalidating cache: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to invalidate cache: {str(e)}")
+
 @app.post("/save-analysis")
 async def save_analysis(analysis: Dict[str, Any]):
     """
@@ -331,16 +612,13 @@ async def save_analysis(analysis: Dict[str, Any]):
         session_id = "default_session"
         
         # Store analysis results
-        if session_id not in analysis_storage:
-            analysis_storage[session_id] = []
-        
-        analysis_storage[session_id].append(analysis)
+        total_saved = await analysis_storage.append(session_id, analysis)
         
         return {
             "success": True,
             "message": "Analysis results saved successfully",
             "session_id": session_id,
-            "total_saved": len(analysis_storage[session_id])
+            "total_saved": total_saved
         }
         
     except Exception as e:
@@ -356,19 +634,7 @@ async def list_json_files():
         Dict with list of JSON files
     """
     try:
-        import glob
-        import os
-        
-        # List all JSON files in stored_queries directory
-        json_files = []
-        json_pattern = "stored_queries/*.json"
-        
-        for file_path in glob.glob(json_pattern):
-            filename = os.path.basename(file_path)
-            json_files.append(filename)
-        
-        # Sort files by creation time (newest first)
-        json_files.sort(key=lambda x: os.path.getctime(f"stored_queries/{x}"), reverse=True)
+        json_files = await asyncio.to_thread(_cached_json_files)
         
         return {
             "success": True,
@@ -393,7 +659,9 @@ async def get_analysis(session_id: str):
         Dict with saved analysis results
     """
     try:
-        if session_id not in analysis_storage:
+        results = await analysis_storage.get_all(session_id)
+        
+        if not results:
             return {
                 "success": False,
                 "message": "No analysis results found for this session",
@@ -402,8 +670,8 @@ async def get_analysis(session_id: str):
         
         return {
             "success": True,
-            "message": f"Retrieved {len(analysis_storage[session_id])} analysis results",
-            "results": analysis_storage[session_id],
+            "message": f"Retrieved {len(results)} analysis results",
+            "results": results,
             "session_id": session_id
         }
         
@@ -413,4 +681,7 @@ async def get_analysis(session_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    # loop="auto" uses uvloop when installed (all platforms except Windows);
+    # an import string is required for uvicorn to spawn multiple workers
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, loop="auto", http="httptools", workers=WORKERS)
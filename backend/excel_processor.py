@@ -3,49 +3,218 @@ Excel file processing and metadata extraction for Phase 1
 ONLY handle Excel file parsing and metadata extraction
 DO NOT add business logic, agents, or complex processing
 """
-import pandas as pd
-from typing import Dict, List, Any
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+import openpyxl
+import orjson
+from typing import Dict, List, Any, Optional, Tuple
 from fastapi import UploadFile
 
 
-def extract_file_metadata(uploaded_files: List[UploadFile]) -> Dict[str, Any]:
+# Number of data rows sampled per sheet to infer field types
+TYPE_SAMPLE_ROWS = 100
+
+# Metadata sidecars keyed by file content hash
+METADATA_CACHE_DIR = "cache/metadata"
+
+# Version of the metadata produced by _parse_file_metadata/_infer_type/
+# _header_names; bump it whenever their output changes so sidecars written
+# by the previous parser are no longer served
+PARSER_VERSION = "1"
+
+# Accepted Excel file extensions and content-type prefixes (tuples so a single
+# endswith/startswith call checks them all)
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+EXCEL_CONTENT_TYPES = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.ms-excel",
+)
+
+
+@dataclass(slots=True)
+class FileEntry:
+    """
+    Per-file upload summary sent to the frontend (AgentChat)
+    
+    Converted with dataclasses.asdict() only when building the JSON response.
+    """
+    name: str
+    size: int
+    content_type: str
+    fields: Tuple[Any, ...]
+    sheets: Dict[str, Any]
+    file_index: int
+    json_filename: str
+
+
+def _infer_type(values: List[Any]) -> str:
     """
-    Extract basic sheet names, field names, and types from Excel files
+    Infer a pandas-style dtype name from sampled cell values
+    
+    Example:
+        _infer_type([1, 2, 3]) -> "int64"
+        _infer_type([1, 2.5]) -> "float64"
+    """
+    present = [v for v in values if v is not None]
+    if not present:
+        return "object"
+    if all(isinstance(v, bool) for v in present):
+        return "bool"
+    if all(isinstance(v, (datetime, date)) for v in present):
+        return "datetime64[ns]"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        # Excel stores whole numbers as floats; like pandas, treat them as
+        # integers, but missing values force a float column
+        if len(present) == len(values) and all(float(v).is_integer() for v in present):
+            return "int64"
+        return "float64"
+    return "object"
+
+
+def _header_names(header: List[Any]) -> List[str]:
+    """Name header cells the way pandas does ("Unnamed: n" for blanks, "X.1" for repeats)"""
+    # Trailing empty header cells are not columns
+    while header and header[-1] is None:
+        header = header[:-1]
+    
+    names = []
+    seen: Dict[str, int] = {}
+    for i, cell in enumerate(header):
+        name = f"Unnamed: {i}" if cell is None else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def extract_file_metadata(file_path: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract basic sheet names, field names, and types from a saved Excel file
+    
+    When content_hash is given, metadata is cached in a JSON sidecar named
+    after the hash (and PARSER_VERSION), so re-uploading identical bytes
+    skips parsing entirely.
     
     Args:
-        uploaded_files: List of uploaded Excel files
+        file_path: Path of the Excel file on disk
+        content_hash: Hex digest of the file contents (optional)
         
     Returns:
-        Dict with structure: {"filename": {"sheets": {"sheet_name": {"fields": [], "types": {}}}}}
+        Dict with structure: {"sheets": {"sheet_name": {"fields": [], "types": {}, "row_count": 0}}}
+        or {"error": "..."} if the file could not be parsed
     """
-    metadata = {}
+    # Sidecars live under the parser version, so parser changes never serve
+    # metadata produced by older code
+    sidecar = Path(METADATA_CACHE_DIR) / PARSER_VERSION / f"{content_hash}.json" if content_hash else None
+    
+    # Cache hit: a stat plus a small JSON load instead of parsing the workbook
+    if sidecar is not None:
+        try:
+            return orjson.loads(sidecar.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            pass
+    
+    file_metadata = _parse_file_metadata(file_path)
     
-    for file in uploaded_files:
+    # Only successful parses are cached so a broken upload can be retried
+    if sidecar is not None and "error" not in file_metadata:
         try:
-            # Read Excel file with pandas
-            df_dict = pd.read_excel(file.file, sheet_name=None)
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            sidecar.write_bytes(orjson.dumps(file_metadata))
+        except OSError as e:
+            print(f"Error caching metadata for {file_path}: {e}")
+    
+    return file_metadata
+
+
+def _parse_file_metadata(file_path: str) -> Dict[str, Any]:
+    """
+    Parse sheet metadata with openpyxl in read-only mode
+    
+    Rows are streamed instead of loading whole sheets into DataFrames;
+    types are inferred from a sample of data rows.
+    """
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    except Exception as e:
+        # Log error and continue with other files
+        print(f"Error processing {file_path}: {e}")
+        return {"error": str(e)}
+    
+    try:
+        file_metadata = {"sheets": {}}
+        
+        for ws in workbook.worksheets:
+            rows = ws.iter_rows(values_only=True)
             
-            file_metadata = {"sheets": {}}
+            # Extract field names from the header row
+            fields = _header_names(list(next(rows, ())))
             
-            for sheet_name, df in df_dict.items():
-                # Extract field names and types
-                fields = list(df.columns)
-                types = {col: str(df[col].dtype) for col in fields}
-                
-                file_metadata["sheets"][sheet_name] = {
-                    "fields": fields,
-                    "types": types,
-                    "row_count": len(df)
-                }
+            # Stream the data rows once: keep a small sample of non-empty rows
+            # to infer types and track the last non-empty row for the count
+            # (formatted but empty trailing rows are not records)
+            sample = []
+            row_count = 0
+            for index, row in enumerate(rows, start=1):
+                if any(value is not None for value in row):
+                    row_count = index
+                    if len(sample) < TYPE_SAMPLE_ROWS:
+                        sample.append(row)
             
-            metadata[file.filename] = file_metadata
+            types = {
+                field: _infer_type([row[i] if i < len(row) else None for row in sample])
+                for i, field in enumerate(fields)
+            }
             
-        except Exception as e:
-            # Log error and continue with other files
-            print(f"Error processing {file.filename}: {e}")
-            metadata[file.filename] = {"error": str(e)}
+            file_metadata["sheets"][ws.title] = {
+                "fields": fields,
+                "types": types,
+                "row_count": row_count
+            }
+        
+        return file_metadata
+        
+    except Exception as e:
+        # Log error and continue with other files
+        print(f"Error processing {file_path}: {e}")
+        return {"error": str(e)}
+    finally:
+        # Read-only workbooks keep the file handle open until closed
+        workbook.close()
+
+
+def _validate_single_file(file: UploadFile) -> List[str]:
+    """
+    Check one file's name, size (<50MB), type (.xlsx/.xls) and content type
+    
+    Returns:
+        List of error messages (empty if the file is valid)
+    """
+    file_errors = []
+    
+    # Reject names that could escape stored_queries once used in a path
+    if "/" in file.filename or "\\" in file.filename:
+        file_errors.append("Filename must not contain path separators")
+    
+    # Check file size (50MB limit)
+    if file.size > 50 * 1024 * 1024:
+        file_errors.append(f"File size {file.size / (1024*1024):.1f}MB exceeds 50MB limit")
     
-    return metadata
+    # Check file type
+    if not file.filename.endswith(EXCEL_EXTENSIONS):
+        file_errors.append("File must be .xlsx or .xls format")
+    
+    # Check content type - be more permissive for testing
+    # Excel files uploaded via curl often have generic content types
+    if file.content_type and file.content_type != "application/octet-stream":
+        if not file.content_type.startswith(EXCEL_CONTENT_TYPES):
+            file_errors.append("Invalid Excel file content type")
+    
+    return file_errors
 
 
 def validate_excel_files(files: List[UploadFile]) -> Dict[str, Any]:
@@ -70,22 +239,7 @@ def validate_excel_files(files: List[UploadFile]) -> Dict[str, Any]:
         return validation_results
     
     for file in files:
-        file_errors = []
-        
-        # Check file size (50MB limit)
-        if file.size > 50 * 1024 * 1024:
-            file_errors.append(f"File size {file.size / (1024*1024):.1f}MB exceeds 50MB limit")
-        
-        # Check file type
-        if not (file.filename.endswith('.xlsx') or file.filename.endswith('.xls')):
-            file_errors.append("File must be .xlsx or .xls format")
-        
-        # Check content type - be more permissive for testing
-        # Excel files uploaded via curl often have generic content types
-        if file.content_type and file.content_type != "application/octet-stream":
-            if not (file.content_type.startswith('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet') or \
-                   file.content_type.startswith('application/vnd.ms-excel')):
-                file_errors.append("Invalid Excel file content type")
+        file_errors = _validate_single_file(file)
         
         if file_errors:
             validation_results["rejected_files"].append({
@@ -4,8 +4,9 @@ ONLY handle SQLite database operations
 DO NOT add query logic or agent interactions
 """
 import sqlite3
+from datetime import date, datetime, time
 import pandas as pd
-from typing import Optional
+from typing import Any, Optional
 
 
 def create_memory_database() -> sqlite3.Connection:
@@ -25,6 +26,14 @@ def create_memory_database() -> sqlite3.Connection:
         # Set timeout for busy database
         conn.execute("PRAGMA busy_timeout = 30000")
         
+        # Session data is transient, so skip durability work on bulk loads.
+        # The journal stays in memory (not OFF) so a failed load can still roll back
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        
         return conn
         
     except Exception as e:
@@ -32,9 +41,62 @@ def create_memory_database() -> sqlite3.Connection:
         raise
 
 
+def _quote_identifier(name: str) -> str:
+    """Quote a table or column name for use in SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# SQLite column type df.to_sql() picks for each pd.api.types.infer_dtype() result
+# (anything else is stored as TEXT)
+_SQLITE_TYPES = {
+    "string": "TEXT",
+    "floating": "REAL",
+    "integer": "INTEGER",
+    "boolean": "INTEGER",
+    "timedelta64": "INTEGER",
+    "datetime64": "TIMESTAMP",
+    "datetime": "TIMESTAMP",
+    "date": "DATE",
+    "time": "TIME",
+}
+
+
+def _sqlite_column_type(column: pd.Series) -> str:
+    """Map a DataFrame column to the SQLite column type df.to_sql() would use"""
+    return _SQLITE_TYPES.get(pd.api.types.infer_dtype(column, skipna=True), "TEXT")
+
+
+def _sqlite_value(value: Any) -> Any:
+    """Convert date/time objects to the text df.to_sql()'s sqlite adapters store"""
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}.{value.microsecond:06d}"
+    return value
+
+
+def _sqlite_rows(df: pd.DataFrame):
+    """Iterate DataFrame rows as tuples of values sqlite3 can bind (NaN/NaT become NULL)"""
+    columns = []
+    for _, column in df.items():
+        missing = column.isna().to_numpy()
+        if column.dtype.kind == "m":
+            # Timedeltas are stored as integers in the column unit, as df.to_sql()
+            # does (NaT becomes NULL rather than pandas' minimum-int sentinel)
+            values = column.to_numpy().view("i8").astype(object)
+        else:
+            values = column.to_numpy(dtype=object)
+            if column.dtype.kind in "OM":
+                values = [_sqlite_value(value) for value in values]
+        columns.append([None if is_missing else value for value, is_missing in zip(values, missing)])
+    return zip(*columns)
+
+
 def dataframe_to_table(conn: sqlite3.Connection, df: pd.DataFrame, table_name: str) -> bool:
     """
-    Convert pandas DataFrame to SQLite table using df.to_sql()
+    Convert pandas DataFrame to SQLite table in a single transaction
     
     Args:
         conn: SQLite connection
@@ -49,18 +111,26 @@ def dataframe_to_table(conn: sqlite3.Connection, df: pd.DataFrame, table_name: s
         if not table_name.replace('_', '').isalnum():
             raise ValueError(f"Invalid table name: {table_name}")
         
-        # Convert DataFrame to SQLite table
-        df.to_sql(
-            name=table_name,
-            con=conn,
-            if_exists='replace',  # Replace if exists
-            index=False,  # Don't include DataFrame index
-            method='multi'  # Use multi-insert for better performance
+        # Build the schema from the column contents, as df.to_sql() infers it
+        table = _quote_identifier(table_name)
+        columns = ", ".join(
+            f"{_quote_identifier(name)} {_sqlite_column_type(column)}" for name, column in df.items()
         )
+        placeholders = ", ".join("?" * len(df.columns))
+        
+        # Replace the table and insert every row with one executemany inside
+        # one transaction (rolled back on error). A transaction the caller
+        # already has open is joined and committed, as df.to_sql() does
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE {table} ({columns})")
+            conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", _sqlite_rows(df))
         
         # Verify table was created
         cursor = conn.cursor()
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
         
         if cursor.fetchone():
             print(f"Successfully created table: {table_name}")
@@ -88,12 +158,12 @@ def get_table_info(conn: sqlite3.Connection, table_name: str) -> Optional[dict]:
     try:
         cursor = conn.cursor()
         
-        # Get table schema
-        cursor.execute(f"PRAGMA table_info({table_name})")
+        # Get table schema (table-valued pragma, so the name can be bound)
+        cursor.execute("SELECT * FROM pragma_table_info(?)", (table_name,))
         columns = cursor.fetchall()
         
         # Get row count
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        cursor.execute(f"SELECT COUNT(*) FROM {_quote_identifier(table_name)}")
         row_count = cursor.fetchone()[0]
         
         return {
@@ -26,24 +26,14 @@ def test_contractors_file():
     print(f"File size: {file_path.stat().st_size} bytes")
     
     try:
-        # Create a mock UploadFile object
-        class MockUploadFile:
-            def __init__(self, filepath):
-                self.filename = filepath.name
-                self.file = open(filepath, 'rb')
-                self.size = filepath.stat().st_size
-                self.content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        
-        # Test the processor
-        mock_file = MockUploadFile(file_path)
-        result = extract_file_metadata([mock_file])
+        # Test the processor on the file path (uploads are parsed after being saved)
+        result = extract_file_metadata(str(file_path))
         
         print("\n📊 EXTRACTION RESULTS:")
         print(f"Result keys: {list(result.keys())}")
         
-        if "Contractors.xlsx" in result:
-            file_data = result["Contractors.xlsx"]
-            print(f"File data keys: {list(file_data.keys())}")
+        if "error" not in result:
+            file_data = result
             
             if "sheets" in file_data:
                 for sheet_name, sheet_data in file_data["sheets"].items():
@@ -54,7 +44,7 @@ def test_contractors_file():
             else:
                 print("❌ No sheets found in result")
         else:
-            print("❌ Contractors.xlsx not found in result")
+            print(f"❌ Extraction failed: {result['error']}")
             
     except Exception as e:
         print(f"❌ Error: {e}")
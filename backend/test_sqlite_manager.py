@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for sqlite_manager.py
+Checks dataframe_to_table() stores the same rows and schema as df.to_sql()
+"""
+import sys
+import os
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlite_manager import create_memory_database, dataframe_to_table
+
+def build_frame() -> pd.DataFrame:
+    """DataFrame covering the column types pd.read_excel() can produce"""
+    return pd.DataFrame({
+        "Count": [1, 2, 3],
+        "Rate": [1.5, np.nan, 2.0],
+        "Name": ["a", None, "c"],
+        "Active": [True, False, True],
+        "Timestamp": pd.to_datetime(["2024-01-01", None, "2024-03-01 10:00:01.5"], format="mixed"),
+        "Start Time": [time(9, 30), None, time(17, 45, 5, 250)],
+        "Day": [date(2024, 1, 1), date(2024, 2, 29), None],
+        "Created": [datetime(2024, 1, 1, 8, 0), None, datetime(2024, 5, 6, 7, 8, 9)],
+        # No NaT here: df.to_sql() stores it as the minimum int64, not NULL
+        "Duration": pd.to_timedelta(["1h", "90s", "0s"]),
+    })
+
+def test_dataframe_to_table():
+    """Compare dataframe_to_table() with df.to_sql() and check open transactions"""
+    df = build_frame()
+    
+    # Load with dataframe_to_table first: df.to_sql() registers global sqlite
+    # adapters that would otherwise hide unsupported values
+    conn = create_memory_database()
+    conn.execute("CREATE TABLE audit (note TEXT)")
+    conn.execute("INSERT INTO audit VALUES ('caller transaction still open')")
+    loaded = dataframe_to_table(conn, df, "loaded")
+    if not loaded:
+        print("❌ dataframe_to_table() failed")
+    assert loaded
+    
+    expected = create_memory_database()
+    df.to_sql("loaded", expected, index=False)
+    
+    rows = conn.execute('SELECT * FROM "loaded"').fetchall()
+    schema = conn.execute("SELECT * FROM pragma_table_info('loaded')").fetchall()
+    expected_rows = expected.execute('SELECT * FROM "loaded"').fetchall()
+    expected_schema = expected.execute("SELECT * FROM pragma_table_info('loaded')").fetchall()
+    
+    print(f"{'✅' if rows == expected_rows else '❌'} Rows match df.to_sql(): {rows}")
+    print(f"{'✅' if schema == expected_schema else '❌'} Schema matches df.to_sql(): {[col[1:3] for col in schema]}")
+    
+    audit = conn.execute("SELECT COUNT(*) FROM audit").fetchone()[0]
+    print(f"{'✅' if audit == 1 else '❌'} Caller's open transaction was joined and committed")
+    
+    assert rows == expected_rows
+    assert schema == expected_schema
+    assert audit == 1
+
+if __name__ == "__main__":
+    test_dataframe_to_table()